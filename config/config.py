@@ -1,25 +1,47 @@
 import asyncio
+import httpx
 from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import logging
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_together import ChatTogether
+from aiolimiter import AsyncLimiter
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Load environment variables once per process
+_ENV_LOADED = False
+
+
+def load_env():
+    """Parse the .env file unless it has already been loaded."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+load_env()
 
 # Environment variable configurations
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 WHISPER_API_KEY = os.getenv("WHISPER_API_KEY")
 WHISPER_BASE_URL = os.getenv("WHISPER_BASE_URL")
 WHISPER_MODEL = os.getenv("WHISPER_MODEL")  
+# "api" for an OpenAI-compatible endpoint, "local" for faster-whisper
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "api")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8_float16")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 LLM_MODEL = os.getenv("LLM_MODEL") 
+# Set to "false" for models without JSON mode; replies are then salvaged from prose
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() not in ("0", "false", "no")
+# Provider quotas for the LLM (requests and tokens per minute)
+LLM_RPM = int(os.getenv("LLM_RPM", "60"))
+LLM_TPM = int(os.getenv("LLM_TPM", "60000"))
 
 # Notion Configuration
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -35,28 +57,61 @@ try:
             api_key=WHISPER_API_KEY,
             base_url=WHISPER_BASE_URL,
         )
+        # Plain HTTP client for uploads: streams the multipart body from disk
+        # instead of reading the whole file into memory like the SDK does
+        whisper_http_client = httpx.Client(
+            base_url=WHISPER_BASE_URL,
+            headers={"Authorization": f"Bearer {WHISPER_API_KEY}"},
+            timeout=60,
+        )
         logger.info(f"Whisper client initialized (Base URL: {WHISPER_BASE_URL})")
     else:
         logger.warning("Whisper API key or base URL not set")
         whisper_client = None
+        whisper_http_client = None
 except Exception as e:
     logger.critical(f"Failed to initialize Whisper client: {e}")
     whisper_client = None 
+    whisper_http_client = None
+
+
+# --- Initialize local Whisper pipeline (faster-whisper, optional) ---
+whisper_pipeline = None
+if WHISPER_BACKEND == "local":
+    try:
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+        whisper_pipeline = BatchedInferencePipeline(
+            model=WhisperModel(
+                WHISPER_MODEL,
+                device=WHISPER_DEVICE,
+                compute_type=WHISPER_COMPUTE_TYPE,
+            )
+        )
+        logger.info(f"Local Whisper pipeline initialized (Model: {WHISPER_MODEL}, Device: {WHISPER_DEVICE})")
+    except ImportError:
+        logger.critical("WHISPER_BACKEND is 'local' but faster-whisper is not installed")
+    except Exception as e:
+        logger.critical(f"Failed to initialize local Whisper pipeline: {e}")
 
 
 # --- Initialize LLM client (Google Gemini or Together) ---
+# Both clients run in JSON mode (unless LLM_JSON_MODE is off) so responses can
+# be parsed without scraping
 try:
     # Check which API key is available and initialize appropriate client
     if GOOGLE_API_KEY:
         llm = ChatGoogleGenerativeAI(
             google_api_key=GOOGLE_API_KEY, #type:ignore
-            model=LLM_MODEL
+            model=LLM_MODEL,
+            response_mime_type="application/json" if LLM_JSON_MODE else None
         )
         logger.info(f"LangChain Google Generative AI client initialized (Model: {LLM_MODEL})")
     elif TOGETHER_API_KEY:
         llm = ChatTogether(
             together_api_key=TOGETHER_API_KEY,#type:ignore
-            model=LLM_MODEL
+            model=LLM_MODEL,
+            model_kwargs={"response_format": {"type": "json_object"}} if LLM_JSON_MODE else {}
         )
         logger.info(f"LangChain Together client initialized (Model: {LLM_MODEL})")
     else:
@@ -66,5 +121,24 @@ except Exception as e:
      logger.critical(f"Failed to initialize LLM client: {e}")
      llm = None 
 
+# --- Client-side LLM rate limiting ---
+# Bursts wait here instead of being rejected by the provider and retried with backoff
+llm_request_limiter = AsyncLimiter(LLM_RPM, 60)
+llm_token_limiter = AsyncLimiter(LLM_TPM, 60)
+
+
+async def ainvoke_llm(messages):
+    """
+    Invoke the LLM once both the request and the token budget allow it.
+    
+    Args:
+        messages: Chat messages as role/content dictionaries
+    """
+    # Rough estimate of ~4 characters per token
+    tokens = sum(len(message["content"]) for message in messages) // 4
+    async with llm_request_limiter:
+        await llm_token_limiter.acquire(min(max(tokens, 1), LLM_TPM))
+        return await llm.ainvoke(messages)
+
 async def generate_text():
     return
@@ -1,146 +1,411 @@
+import array
+import asyncio
+import atexit
+import math
+import operator
 import os
+import queue
 import tempfile
+import threading
+import time
 import logging
-import json
 import datetime
+import httpx
+import orjson
 import pyaudio
 import wave
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 
 # Import existing modules
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.config import whisper_client, llm
-from utils.utils import create_calendar_event_from_data, create_notion_note
-
-# Load environment variables
-load_dotenv()
+from config.config import whisper_http_client, whisper_pipeline, llm, ainvoke_llm, WHISPER_MODEL
+from utils.utils import acreate_calendar_event_from_data, acreate_notion_note, create_calendar_events_bulk
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class EventData(BaseModel):
+    """Event details extracted from a voice note by the LLM."""
+    title: str = "Voice Note Event"
+    description: str = ""
+    date: str = Field(default_factory=lambda: datetime.date.today().isoformat())
+    start_time: str = "09:00"
+    end_time: str = "10:00"
+    location: str = ""
+    priority: str = "medium"
+    category: str = "other"
+    attendees: List[str] = Field(default_factory=list)
+    notes: str = ""
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_nulls(cls, data: Any) -> Any:
+        """LLMs often send null for fields they have nothing for; use the defaults instead."""
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+    
+    @field_validator("attendees", mode="before")
+    @classmethod
+    def _drop_null_attendees(cls, value: Any) -> Any:
+        """Skip null entries in the attendee list instead of rejecting the event."""
+        if isinstance(value, list):
+            return [email for email in value if email is not None]
+        return value
+
+class EventBatch(BaseModel):
+    """Events extracted from several voice notes in one LLM call."""
+    events: List[EventData]
+
+# Shared by the single and batched prompts below
+_EVENT_FIELDS = """{"title": short descriptive title, "description": all relevant details, "start_time": "HH:MM", "end_time": "HH:MM", "location": "" if none, "priority": "high"|"medium"|"low", "category": "meeting"|"appointment"|"reminder"|"task"|"other", "attendees": [emails mentioned], "notes": extra context}
+Times are 24h HH:MM ("2 PM" = "14:00", "quarter to 8" = "07:45"); ignore impossible times like "29:00"; end_time defaults to start_time + 1h; use 09:00-10:00 if no valid time is given."""
+
+# Kept constant (the date is filled in by EventData) so the prompt prefix is
+# identical on every call and providers can cache it
+_SYS_PROMPT = "Extract a calendar event from the voice note. Reply with one JSON object:\n" + _EVENT_FIELDS
+
+_BATCH_SYS_PROMPT = (
+    "Each voice note below starts with its index [i]. Extract one calendar event per note. "
+    'Reply with one JSON object {"events": [...]} where events[i] is the event for note [i], shaped as:\n'
+    + _EVENT_FIELDS
+)
+
+def _extract_json_object(text: str) -> str:
+    """
+    Return the first complete JSON object embedded in text, or an empty string.
+    
+    Walks the text once, tracking brace depth and skipping string literals.
+    """
+    depth = 0
+    start = 0
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = depth > 0
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return ""
+
+# Worker threads that transcribe finished audio windows while recording continues
+_transcription_pool = ThreadPoolExecutor(max_workers=4)
+
+# Retry policy for Whisper uploads, matching the OpenAI SDK's defaults
+_WHISPER_MAX_RETRIES = 2
+_WHISPER_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """
+    Seconds to wait before retrying a Whisper upload.
+    
+    Honours a numeric Retry-After header, otherwise backs off exponentially.
+    """
+    if response is not None:
+        try:
+            return min(max(float(response.headers.get("retry-after", "")), 0.0), 60.0)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** attempt, 8.0)
+
 class AudioRecordingBot:
     """
     A bot that records audio, transcribes it with Whisper, analyzes it with LLM,
     and creates events in both Notion and Google Calendar.
     """
     
+    __slots__ = (
+        'chunk', 'format', 'channels', 'rate', 'recording', 'segment_seconds',
+        'silence_rms', 'pending_notes', 'audio'
+    )
+    
+    # PyAudio instance shared by all bots; created on first use
+    _audio_singleton = None
+    
+    @classmethod
+    def _get_audio(cls) -> pyaudio.PyAudio:
+        """
+        Return the shared PyAudio instance, initializing PortAudio on first use.
+        
+        Device enumeration is slow, so it only happens once per process.
+        """
+        if cls._audio_singleton is None:
+            cls._audio_singleton = pyaudio.PyAudio()
+            atexit.register(cls._audio_singleton.terminate)
+        return cls._audio_singleton
+    
     def __init__(self):
         # Audio recording parameters
         self.chunk = 1024
         self.format = pyaudio.paInt16
         self.channels = 1
-        self.rate = 44100
+        # Whisper works on 16 kHz audio, anything higher is resampled away
+        self.rate = 16000
         self.recording = False
         
+        # Length of the audio windows sent to Whisper while recording continues
+        self.segment_seconds = 15
+        # Windows quieter than this RMS level (int16 scale) are treated as silence
+        self.silence_rms = 200
+        
+        # Transcripts waiting for a batched LLM analysis
+        self.pending_notes: List[str] = []
+        
         # Initialize audio
-        self.audio = pyaudio.PyAudio()
+        self.audio = self._get_audio()
+        self.rate = self._supported_rate(self.rate)
         
         # Validate clients
-        if not whisper_client:
+        if not whisper_http_client and not whisper_pipeline:
             logger.error("Whisper client not initialized. Please check your API keys.")
         if not llm:
             logger.error("LLM client not initialized. Please check your API keys.")
     
-    def record_audio(self, duration: Optional[int] = None) -> str:
+    def _supported_rate(self, rate: int) -> int:
         """
-        Record audio from microphone and save to temporary file.
+        Check that the default input device can record at the given rate.
         
         Args:
-            duration: Recording duration in seconds. If None, record until user stops.
+            rate: Preferred sample rate in Hz
             
         Returns:
-            Path to the recorded audio file
+            The preferred rate if supported, otherwise the device's default rate
         """
-        # Create temporary file for audio
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_filename = temp_file.name
-        temp_file.close()
+        try:
+            device = self.audio.get_default_input_device_info()
+        except IOError:
+            # No input device; opening the stream will report the problem
+            return rate
+        
+        try:
+            self.audio.is_format_supported(
+                rate,
+                input_device=device['index'],
+                input_channels=self.channels,
+                input_format=self.format
+            )
+            return rate
+        except ValueError:
+            default_rate = int(device['defaultSampleRate'])
+            logger.warning(f"Input device does not support {rate} Hz, recording at {default_rate} Hz")
+            return default_rate
+    
+    def record_audio(self, duration: Optional[int] = None,
+                     on_segment: Optional[Callable[[str], None]] = None) -> List[str]:
+        """
+        Record audio from microphone and save it to temporary files.
         
+        The recording is split into windows of `segment_seconds` so each window
+        can be transcribed while the microphone keeps recording. A window is
+        silent when no chunk in it reaches an RMS level of `silence_rms`. Silent
+        windows at the start or end of the recording are deleted instead of
+        being returned; silent windows between speech are kept.
+        
+        Args:
+            duration: Recording duration in seconds. If None, record until user stops.
+            on_segment: Optional callback invoked with the path of each audio
+                window as soon as it has been written.
+            
+        Returns:
+            Paths to the recorded audio files, in recording order
+        """
         print("🎤 Starting audio recording...")
         if duration:
             print(f"   Recording for {duration} seconds...")
         else:
             print("   Press Enter to stop recording...")
         
+        # PortAudio delivers chunks from its own thread; the loop below only drains them
+        chunks = queue.Queue()
+        
+        def on_audio(in_data, frame_count, time_info, status):
+            chunks.put(in_data)
+            return (None, pyaudio.paContinue)
+        
         # Open stream
         stream = self.audio.open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
             input=True,
-            frames_per_buffer=self.chunk
+            frames_per_buffer=self.chunk,
+            stream_callback=on_audio
         )
         
-        frames = []
+        segment_files = []
+        segment_chunks = int(self.rate / self.chunk * self.segment_seconds)
+        total_chunks = int(self.rate / self.chunk * duration) if duration else None
         self.recording = True
         
+        # The WAV file of the window currently being recorded
+        wf = None
+        segment_file = None
+        # Silent windows after speech, held back until we know whether speech follows
+        held_files = []
+        
+        def emit_segment(path):
+            logger.info(f"Audio saved to: {path}")
+            segment_files.append(path)
+            if on_segment:
+                on_segment(path)
+        
+        def drop_segment(path, rms):
+            logger.warning(f"Skipping silent audio window at the edge of the recording (RMS {rms:.0f}): {path}")
+            os.unlink(path)
+        
+        def close_segment(voiced, energy, samples):
+            wf.close()
+            if not voiced:
+                rms = math.sqrt(energy / samples)
+                if segment_files:
+                    held_files.append((segment_file, rms))
+                else:
+                    # Nothing voiced yet, so this is leading silence
+                    drop_segment(segment_file, rms)
+                return
+            # Speech follows the held windows, so they may hold quiet speech too
+            for path, _ in held_files:
+                emit_segment(path)
+            held_files.clear()
+            emit_segment(segment_file)
+        
+        if not duration:
+            # Manual stop recording
+            def stop_on_enter():
+                input()
+                self.recording = False
+            
+            thread = threading.Thread(target=stop_on_enter)
+            thread.daemon = True
+            thread.start()
+        
         try:
-            if duration:
-                # Fixed duration recording
-                for _ in range(0, int(self.rate / self.chunk * duration)):
-                    data = stream.read(self.chunk)
-                    frames.append(data)
-            else:
-                # Manual stop recording
-                import threading
-                def stop_on_enter():
-                    input()
-                    self.recording = False
+            captured = 0
+            segment_captured = 0
+            segment_energy = 0
+            segment_samples = 0
+            segment_voiced = False
+            # Mean square a chunk must reach to count as speech
+            voiced_power = self.silence_rms ** 2
+            # Bind loop constants to locals; self.recording is re-read since another thread clears it
+            get_chunk = chunks.get
+            chunk = self.chunk
+            mul = operator.mul
+            while self.recording and (total_chunks is None or captured < total_chunks):
+                data = get_chunk()
+                if wf is None:
+                    # With a fixed duration every window's length is known up front
+                    nframes = None
+                    if total_chunks is not None:
+                        nframes = min(segment_chunks, total_chunks - captured) * chunk
+                    wf, segment_file = self._open_segment(nframes)
+                wf.writeframesraw(data)
                 
-                thread = threading.Thread(target=stop_on_enter)
-                thread.daemon = True
-                thread.start()
+                # Chunks are judged on their own so a short phrase isn't averaged
+                # away; the window's running sum of squares is kept for logging
+                samples = array.array('h', data)
+                chunk_energy = sum(map(mul, samples, samples))
+                if chunk_energy >= voiced_power * len(samples):
+                    segment_voiced = True
+                segment_energy += chunk_energy
+                segment_samples += len(samples)
                 
-                while self.recording:
-                    data = stream.read(self.chunk)
-                    frames.append(data)
+                captured += 1
+                segment_captured += 1
+                if segment_captured == segment_chunks:
+                    close_segment(segment_voiced, segment_energy, segment_samples)
+                    wf = None
+                    segment_captured = 0
+                    segment_energy = 0
+                    segment_samples = 0
+                    segment_voiced = False
                     
         except KeyboardInterrupt:
             print("\n🛑 Recording interrupted by user")
         finally:
+            self.recording = False
             stream.stop_stream()
             stream.close()
             
         print("✅ Recording finished!")
         
-        # Save audio file
-        with wave.open(temp_filename, 'wb') as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(self.audio.get_sample_size(self.format))
-            wf.setframerate(self.rate)
-            wf.writeframes(b''.join(frames))
+        # Close whatever is left of the last window
+        if wf is not None:
+            close_segment(segment_voiced, segment_energy, segment_samples)
+        # Silent windows still held back are trailing silence
+        for path, rms in held_files:
+            drop_segment(path, rms)
+        return segment_files
+    
+    def _open_segment(self, nframes: Optional[int] = None) -> Tuple[wave.Wave_write, str]:
+        """
+        Open a temporary WAV file for the next audio window.
+        
+        Args:
+            nframes: Number of frames the window will hold, if known. The header
+                is then written once with the right size instead of being
+                patched on close.
             
-        logger.info(f"Audio saved to: {temp_filename}")
-        return temp_filename
+        Returns:
+            Tuple of the open wave writer and the path to the file
+        """
+        # Create temporary file for audio
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
+        temp_filename = temp_file.name
+        temp_file.close()
+        
+        wf = wave.open(temp_filename, 'wb')
+        wf.setnchannels(self.channels)
+        wf.setsampwidth(self.audio.get_sample_size(self.format))
+        wf.setframerate(self.rate)
+        if nframes:
+            wf.setnframes(nframes)
+        return wf, temp_filename
     
     def transcribe_audio(self, audio_file: str) -> str:
         """
         Transcribe audio file using Whisper.
         
+        Uses the local faster-whisper pipeline when it is configured and the
+        remote Whisper API otherwise.
+        
         Args:
             audio_file: Path to audio file
             
         Returns:
             Transcribed text
         """
-        if not whisper_client:
+        if not whisper_http_client and not whisper_pipeline:
             raise Exception("Whisper client not available")
             
         logger.info("Starting audio transcription...")
         
         try:
-            with open(audio_file, "rb") as file:
-                transcription = whisper_client.audio.transcriptions.create(
-                    model=os.getenv("WHISPER_MODEL"),
-                    file=file
-                )
-            
-            transcribed_text = transcription.text
+            if whisper_pipeline:
+                segments, _ = whisper_pipeline.transcribe(audio_file, batch_size=16)
+                transcribed_text = "".join(segment.text for segment in segments)
+            else:
+                response = self._post_transcription(audio_file)
+                transcribed_text = response.json()["text"]
             logger.info(f"Audio transcription completed. Text length: {len(transcribed_text)} characters")
             
             return transcribed_text
@@ -149,7 +414,43 @@ class AudioRecordingBot:
             logger.error(f"Error during transcription: {e}")
             raise
     
-    def analyze_with_llm(self, text: str) -> Dict[str, Any]:
+    def _post_transcription(self, audio_file: str) -> httpx.Response:
+        """
+        Upload an audio file to the Whisper API, retrying transient failures.
+        
+        Connection errors and 408/409/429/5xx responses are retried with
+        backoff, like the OpenAI SDK does.
+        
+        Args:
+            audio_file: Path to audio file
+            
+        Returns:
+            The successful response
+        """
+        for attempt in range(_WHISPER_MAX_RETRIES + 1):
+            response = None
+            try:
+                # httpx streams the file into the multipart body chunk by chunk
+                with open(audio_file, "rb") as file:
+                    response = whisper_http_client.post(
+                        "audio/transcriptions",
+                        files={"file": (os.path.basename(audio_file), file, "audio/wav")},
+                        data={"model": WHISPER_MODEL}
+                    )
+                if response.status_code not in _WHISPER_RETRY_STATUSES or attempt == _WHISPER_MAX_RETRIES:
+                    response.raise_for_status()
+                    return response
+                reason = f"status {response.status_code}"
+            except httpx.TransportError as e:
+                if attempt == _WHISPER_MAX_RETRIES:
+                    raise
+                reason = str(e)
+            
+            delay = _retry_delay(response, attempt)
+            logger.warning(f"Whisper upload failed ({reason}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    async def analyze_with_llm(self, text: str) -> Dict[str, Any]:
         """
         Analyze transcribed text with LLM to extract event information.
         
@@ -164,76 +465,33 @@ class AudioRecordingBot:
             
         logger.info("Starting LLM analysis of transcribed text...")
         
-        # Always use today's date
-        today_date = datetime.date.today().isoformat()
-        
-        system_prompt = f"""
-         You are an AI assistant that analyzes voice notes to extract calendar event information.
-         
-         From the provided text, extract the following information and return it as JSON:
-         {{
-             "title": "Brief, descriptive title for the event based on the content",
-             "description": "Detailed description including all relevant information from the voice note",
-             "date": "{today_date}",
-             "start_time": "HH:MM format (extract time from voice note - this is REQUIRED)",
-             "end_time": "HH:MM format (extract from voice note, if not mentioned add 1 hour to start_time)",
-             "location": "Location if mentioned, otherwise empty string",
-             "priority": "high/medium/low based on urgency indicators in the voice note",
-             "category": "meeting/appointment/reminder/task/other",
-             "attendees": ["list of email addresses if mentioned in the voice note"],
-             "notes": "Any additional context or details from the voice note"
-         }}
-         
-         CRITICAL TIME PARSING INSTRUCTIONS:
-         - The DATE is ALWAYS today ({today_date}) - do not change this
-         - Look for time mentions like: "at 2 PM", "3:30", "nine thirty", "half past two", "quarter to five", "7 AM", "7:00", "seven o'clock"
-         - Convert ALL times to valid 24-hour format (e.g., "2 PM" = "14:00", "7 AM" = "07:00")
-         - IGNORE any invalid times like "29:00", "25:00", "26:00", or any hour > 23
-         - If you see malformed times like "22:00 PM" or "29:00 p.m.", interpret them logically:
-           * "22:00 PM" should become "22:00" (22:00 is already evening in 24-hour format)
-           * "29:00" is invalid - ignore it
-         - Valid hours: 00-23, Valid minutes: 00-59
-         - If NO valid time is found or all times are garbled/invalid, use these defaults:
-           * start_time: "09:00" (9 AM)
-           * end_time: "10:00" (10 AM)
-         - Common speech patterns: "7 o'clock" = "07:00", "half past 7" = "07:30", "quarter to 8" = "07:45"
-         - Create a meaningful TITLE based on what the user is talking about
-         - Include all relevant details in the DESCRIPTION
-         """
-        
-        user_prompt = f"Please analyze this voice note and extract event information:\n\n{text}"
+        user_prompt = f"Voice note:\n\n{text}"
         
         try:
             messages = [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": _SYS_PROMPT},
                 {"role": "user", "content": user_prompt}
             ]
             
-            response = llm.invoke(messages)
+            response = await ainvoke_llm(messages)
+            
             result_text = response.content
             
-            # Try to parse JSON from the response
+            # The LLM runs in JSON mode, so the response is usually the event object itself
             try:
-                # Extract JSON from response (in case there's extra text)
-                start_idx = result_text.find('{')
-                end_idx = result_text.rfind('}') + 1
-                json_str = result_text[start_idx:end_idx]
-                event_data = json.loads(json_str)
-            except (json.JSONDecodeError, ValueError):
-                # Fallback if JSON parsing fails - always use today's date
-                today_date = datetime.date.today().isoformat()
-                event_data = {
-                    "title": "Voice Note Event",
-                    "description": text,
-                    "date": today_date,
-                    "start_time": "09:00",
-                    "end_time": "10:00",
-                    "location": "",
-                    "priority": "medium",
-                    "category": "other",
-                    "attendees": [],
-                    "notes": "Analyzed from voice note"
-                }
+                event_data = EventData.model_validate_json(result_text).model_dump()
+            except ValidationError:
+                try:
+                    # Some models still wrap the object in prose or code fences
+                    json_str = _extract_json_object(result_text)
+                    event_data = EventData.model_validate(orjson.loads(json_str)).model_dump()
+                except (orjson.JSONDecodeError, ValidationError) as e:
+                    # Fallback if JSON parsing fails - always use today's date
+                    logger.warning(f"Could not parse LLM response, using a default event: {e}")
+                    event_data = EventData(
+                        description=text,
+                        notes="Analyzed from voice note"
+                    ).model_dump()
             
             logger.info(f"LLM analysis completed for event: {event_data.get('title', 'Untitled')}")
             
@@ -243,7 +501,50 @@ class AudioRecordingBot:
             logger.error(f"Error during LLM analysis: {e}")
             raise
     
-    def create_notion_note_from_event(self, event_data: Dict[str, Any]) -> None:
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several transcribed voice notes with a single LLM call.
+        
+        Args:
+            texts: Transcribed texts to analyze
+            
+        Returns:
+            List of event dictionaries, one per text and in the same order
+        """
+        if not llm:
+            raise Exception("LLM client not available")
+            
+        logger.info(f"Starting batched LLM analysis of {len(texts)} voice notes...")
+        
+        user_prompt = "\n---\n".join(f"[{index}] {text}" for index, text in enumerate(texts))
+        
+        try:
+            messages = [
+                {"role": "system", "content": _BATCH_SYS_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ]
+            
+            response = await ainvoke_llm(messages)
+            
+            try:
+                events = EventBatch.model_validate(orjson.loads(response.content)).events
+            except (orjson.JSONDecodeError, ValidationError):
+                events = None
+            
+            if events is None or len(events) != len(texts):
+                # Don't guess which event belongs to which note, analyze them one by one
+                logger.warning("Batched LLM response did not match the queued notes, analyzing them individually")
+                return list(await asyncio.gather(*(self.analyze_with_llm(text) for text in texts)))
+            
+            logger.info(f"Batched LLM analysis completed for {len(events)} events")
+            
+            return [event.model_dump() for event in events]
+            
+        except Exception as e:
+            logger.error(f"Error during batched LLM analysis: {e}")
+            raise
+    
+    async def create_notion_note_from_event(self, event_data: Dict[str, Any]) -> None:
         """
         Create a Notion note from event data.
         
@@ -277,16 +578,15 @@ class AudioRecordingBot:
             event_data.get('notes', 'Created from voice note')
         ])
         
-        content = "\n".join(content_parts)
-        
         try:
-            create_notion_note(title, content)
+            # Each line becomes its own paragraph block in Notion
+            await acreate_notion_note(title, content_parts)
             logger.info("Notion note created successfully from event data")
         except Exception as e:
             logger.error(f"Error creating Notion note: {e}")
             raise
     
-    def create_calendar_event_from_event(self, event_data: Dict[str, Any]) -> None:
+    async def create_calendar_event_from_event(self, event_data: Dict[str, Any]) -> None:
         """
         Create a Google Calendar event from event data extracted from voice note.
         
@@ -296,62 +596,138 @@ class AudioRecordingBot:
         logger.info("Creating Google Calendar event...")
         
         try:
-            # Extract data from the event_data dictionary
-            title = event_data.get('title', 'Voice Note Event')
-            description = event_data.get('description', 'Created from voice note')
-            date_str = event_data.get('date', datetime.date.today().isoformat())
-            start_time = event_data.get('start_time', '09:00')
-            end_time = event_data.get('end_time', '10:00')
-            location = event_data.get('location', '')
-            attendees = event_data.get('attendees', [])
-            
             # Call the updated calendar creation function with real data
-            create_calendar_event_from_data(
-                title=title,
-                description=description,
-                date_str=date_str,
-                start_time=start_time,
-                end_time=end_time,
-                location=location,
-                attendees=attendees
-            )
+            await acreate_calendar_event_from_data(**self._calendar_fields(event_data))
             logger.info("Google Calendar event created successfully from voice note data")
         except Exception as e:
             logger.error(f"Error creating calendar event: {e}")
             raise
     
-    def process_voice_note(self, duration: Optional[int] = None) -> Dict[str, Any]:
+    async def create_calendar_events_from_events(self, events: List[Dict[str, Any]]) -> None:
         """
-        Complete workflow: record, transcribe, analyze, and create events.
+        Create Google Calendar events for several events with batched API requests.
+        
+        Args:
+            events: List of dictionaries containing event information
+        """
+        logger.info(f"Creating {len(events)} Google Calendar events...")
+        
+        try:
+            created_events = await asyncio.to_thread(
+                create_calendar_events_bulk,
+                [self._calendar_fields(event_data) for event_data in events]
+            )
+            failed = [
+                event_data.get('title', 'Voice Note Event')
+                for event_data, created in zip(events, created_events)
+                if created is None
+            ]
+            if failed:
+                raise RuntimeError(
+                    f"{len(failed)} of {len(events)} calendar events were not created: {', '.join(failed)}"
+                )
+            logger.info("Google Calendar events created successfully from voice note data")
+        except Exception as e:
+            logger.error(f"Error creating calendar events: {e}")
+            raise
+    
+    @staticmethod
+    def _calendar_fields(event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract the calendar event arguments from the event_data dictionary.
+        
+        Args:
+            event_data: Dictionary containing event information
+            
+        Returns:
+            Keyword arguments for create_calendar_event_from_data
+        """
+        return {
+            "title": event_data.get('title', 'Voice Note Event'),
+            "description": event_data.get('description', 'Created from voice note'),
+            "date_str": event_data.get('date', datetime.date.today().isoformat()),
+            "start_time": event_data.get('start_time', '09:00'),
+            "end_time": event_data.get('end_time', '10:00'),
+            "location": event_data.get('location', ''),
+            "attendees": event_data.get('attendees', [])
+        }
+    
+    async def record_and_transcribe(self, duration: Optional[int] = None) -> str:
+        """
+        Record a voice note and transcribe it window by window while recording.
         
         Args:
             duration: Recording duration in seconds. If None, manual stop.
             
         Returns:
-            Dictionary containing all processed data
+            Transcribed text, or an empty string if the recording was silent
         """
+        # Tracked as they are emitted so they are cleaned up even if recording fails
+        audio_files = []
+        futures = []
+        
+        def on_segment(path):
+            audio_files.append(path)
+            futures.append(_transcription_pool.submit(self.transcribe_audio, path))
+        
         try:
-            # Step 1: Record audio
-            audio_file = self.record_audio(duration)
+            # Recording stays on this thread so Ctrl+C still stops it
+            if not self.record_audio(duration, on_segment=on_segment):
+                logger.info("Recording contained no speech, skipping transcription")
+                return ""
             
-            # Step 2: Transcribe audio
-            transcribed_text = self.transcribe_audio(audio_file)
+            transcripts = await asyncio.gather(
+                *(asyncio.wrap_future(future) for future in futures)
+            )
+            return " ".join(text.strip() for text in transcripts).strip()
+        finally:
+            # Drop queued windows and let running uploads finish before their files go away
+            for future in futures:
+                future.cancel()
+            await asyncio.to_thread(wait, futures)
             
-            # Step 3: Analyze with LLM
-            event_data = self.analyze_with_llm(transcribed_text)
+            # Clean up temporary audio files
+            for audio_file in audio_files:
+                try:
+                    os.unlink(audio_file)
+                except Exception as e:
+                    logger.warning(f"Could not clean up audio file: {e}")
+            if audio_files:
+                logger.info("Temporary audio files cleaned up")
+    
+    async def create_entries_from_event(self, event_data: Dict[str, Any]) -> None:
+        """
+        Create the Notion note and Google Calendar event for one event concurrently.
+        
+        Args:
+            event_data: Dictionary containing event information
+        """
+        await asyncio.gather(
+            self.create_notion_note_from_event(event_data),
+            self.create_calendar_event_from_event(event_data)
+        )
+    
+    async def process_voice_note(self, duration: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Complete workflow: record, transcribe, analyze, and create events.
+        
+        Args:
+            duration: Recording duration in seconds. If None, manual stop.
             
-            # Step 4: Create Notion note
-            self.create_notion_note_from_event(event_data)
+        Returns:
+            Dictionary containing all processed data
+        """
+        try:
+            # Step 1 + 2: Record audio and transcribe it
+            transcribed_text = await self.record_and_transcribe(duration)
+            if not transcribed_text:
+                return {"status": "empty"}
             
-            # Step 5: Create Google Calendar event
-            self.create_calendar_event_from_event(event_data)
+            # Step 3: Analyze with LLM
+            event_data = await self.analyze_with_llm(transcribed_text)
             
-            # Clean up temporary audio file
-            try:
-                os.unlink(audio_file)
-                logger.info("Temporary audio file cleaned up")
-            except Exception as e:
-                logger.warning(f"Could not clean up audio file: {e}")
+            # Step 4 + 5: Create the Notion note and Google Calendar event
+            await self.create_entries_from_event(event_data)
             
             logger.info("Voice note processing completed successfully")
             
@@ -368,10 +744,72 @@ class AudioRecordingBot:
                 "error": str(e)
             }
     
-    def __del__(self):
-        """Clean up audio resources."""
-        if hasattr(self, 'audio'):
-            self.audio.terminate()
+    async def queue_voice_note(self, duration: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Record and transcribe a voice note, queueing it for a batched analysis.
+        
+        Args:
+            duration: Recording duration in seconds. If None, manual stop.
+            
+        Returns:
+            Dictionary containing the transcription and queue length
+        """
+        try:
+            transcribed_text = await self.record_and_transcribe(duration)
+            if not transcribed_text:
+                return {"status": "empty"}
+            
+            self.pending_notes.append(transcribed_text)
+            logger.info(f"Voice note queued ({len(self.pending_notes)} pending)")
+            
+            return {
+                "transcription": transcribed_text,
+                "queued": len(self.pending_notes),
+                "status": "queued"
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in voice note processing: {e}")
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+    
+    async def process_queued_notes(self) -> Dict[str, Any]:
+        """
+        Analyze all queued voice notes with one LLM call and create their events.
+        
+        Returns:
+            Dictionary containing all processed data
+        """
+        try:
+            texts = list(self.pending_notes)
+            events = await self.analyze_batch(texts)
+            
+            try:
+                # Notion pages are created concurrently, Calendar events in one batched request
+                await asyncio.gather(
+                    *(self.create_notion_note_from_event(event) for event in events),
+                    self.create_calendar_events_from_events(events)
+                )
+            finally:
+                # Creation was attempted; a retry would duplicate the entries that succeeded
+                del self.pending_notes[:len(texts)]
+            
+            logger.info(f"Processed {len(events)} queued voice notes successfully")
+            
+            return {
+                "transcriptions": texts,
+                "events": events,
+                "status": "success"
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in queued voice note processing: {e}")
+            return {
+                "status": "error",
+                "error": str(e)
+            }
 
 
 def main():
@@ -380,35 +818,57 @@ def main():
     print("=" * 50)
     
     bot = AudioRecordingBot()
+    # One event loop for the whole session so async clients and limiters stay bound to it
+    loop = asyncio.new_event_loop()
     
     while True:
         print("\nOptions:")
         print("1. Record voice note (press Enter to stop)")
         print("2. Record voice note (10 seconds)")
         print("3. Record voice note (30 seconds)")
-        print("4. Quit")
+        print("4. Queue voice note for later (press Enter to stop)")
+        print(f"5. Process all queued notes ({len(bot.pending_notes)} queued)")
+        print("6. Quit")
         
-        choice = input("\nEnter your choice (1-4): ").strip()
+        choice = input("\nEnter your choice (1-6): ").strip()
         
         if choice == "1":
-            result = bot.process_voice_note()
+            result = loop.run_until_complete(bot.process_voice_note())
         elif choice == "2":
-            result = bot.process_voice_note(duration=10)
+            result = loop.run_until_complete(bot.process_voice_note(duration=10))
         elif choice == "3":
-            result = bot.process_voice_note(duration=30)
+            result = loop.run_until_complete(bot.process_voice_note(duration=30))
         elif choice == "4":
+            result = loop.run_until_complete(bot.queue_voice_note())
+        elif choice == "5":
+            if not bot.pending_notes:
+                print("📭 No queued voice notes.")
+                continue
+            result = loop.run_until_complete(bot.process_queued_notes())
+        elif choice == "6":
             print("👋 Goodbye!")
             break
         else:
             print("❌ Invalid choice. Please try again.")
             continue
         
-        if result.get("status") == "success":
+        if result.get("status") == "empty":
+            print("\n🔇 No speech detected - nothing was created.")
+        elif result.get("status") == "queued":
+            print(f"\n📥 Voice note queued ({result['queued']} pending):")
+            print(f"   Transcription: {result['transcription'][:100]}...")
+        elif result.get("status") == "success" and "events" in result:
+            print(f"\n📊 Processed {len(result['events'])} queued notes:")
+            for event in result['events']:
+                print(f"   Event Title: {event['title']}")
+        elif result.get("status") == "success":
             print(f"\n📊 Processing Summary:")
             print(f"   Transcription: {result['transcription'][:100]}...")
             print(f"   Event Title: {result['event_data']['title']}")
         else:
             print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
+    
+    loop.close()
 
 
 if __name__ == "__main__":
@@ -3,14 +3,25 @@ from config.config import (
     whisper_client, llm, generate_text,
     NOTION_API_KEY, PARENT_PAGE_ID, CALENDAR_SCOPES
 )
+import asyncio
+import atexit
 import datetime
 import os.path
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import httplib2
+import orjson
 import requests
-import json
 import logging
+from typing import List, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -19,100 +30,353 @@ from googleapiclient.errors import HttpError
 logger = logging.getLogger(__name__)
 
 # Re-export for backward compatibility
-__all__ = ['whisper_client', 'llm', 'generate_text', 'create_calendar_event_from_data', 'create_notion_note']
+__all__ = [
+    'whisper_client', 'llm', 'generate_text',
+    'create_calendar_event_from_data', 'create_calendar_events_bulk', 'create_notion_note',
+    'create_note_and_event',
+    'acreate_calendar_event_from_data', 'acreate_notion_note'
+]
 
+# Shared Notion session so the TLS connection to api.notion.com is reused across notes
+_notion_session = requests.Session()
+_notion_session.headers.update({
+    "Authorization": f"Bearer {NOTION_API_KEY}",
+    "Content-Type": "application/json",
+    "Notion-Version": "2022-06-28",  # Required version header
+})
+_notion_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    # Page creation is a POST, which urllib3 doesn't retry unless told to
+    max_retries=Retry(
+        total=4,
+        # A read timeout means Notion got the request and likely created the
+        # page, so retrying it would mostly create duplicates
+        read=0,
+        backoff_factor=0.3,
+        # No 504: like a read timeout, the gateway may have passed the request on
+        status_forcelist=[429, 502, 503],
+        allowed_methods={"POST"},
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
+))
+atexit.register(_notion_session.close)
 
-def create_calendar_event_from_data(title, description, date_str, start_time, end_time, location="", attendees=None):
+# (connect, read) timeouts so a stalled Notion request can't hang the bot
+_NOTION_TIMEOUT = (3.05, 10)
+
+
+# Paths for credentials and token files in the project root (one level up from utils/)
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CREDENTIALS_PATH = os.path.join(_PROJECT_ROOT, "credentials.json")
+_TOKEN_PATH = os.path.join(_PROJECT_ROOT, "token.json")
+
+
+# Credentials and Calendar service shared across calls, keyed on token.json's mtime
+_calendar_service_cache = {"creds": None, "http": None, "service": None, "mtime": None}
+
+
+def _close_calendar_service():
     """
-    Creates a Google Calendar event with the provided data.
-    
-    Args:
-        title: Event title
-        description: Event description  
-        date_str: Date in YYYY-MM-DD format (IGNORED - always uses today's date)
-        start_time: Start time in HH:MM format
-        end_time: End time in HH:MM format
-        location: Event location (optional)
-        attendees: List of email addresses (optional)
+    Closes the cached Calendar service's keep-alive connections at exit.
+    """
+    if _calendar_service_cache["service"] is not None:
+        _calendar_service_cache["service"].close()
+
+
+atexit.register(_close_calendar_service)
+
+
+def _token_mtime():
+    """
+    Returns the modification time of token.json, or None if it doesn't exist.
     """
-    if attendees is None:
-        attendees = []
+    try:
+        return os.stat(_TOKEN_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+# token.json writes are done by a background thread, off the event-creation path
+_token_writes = queue.Queue()
+
+
+def _token_writer():
+    """
+    Writes queued token files, atomically and newest contents only.
+    """
+    while True:
+        pending = dict([_token_writes.get()])
+        processed = 1
+        # Coalesce writes queued meanwhile; only the newest contents of each file matter
+        while True:
+            try:
+                path, data = _token_writes.get_nowait()
+            except queue.Empty:
+                break
+            pending[path] = data
+            processed += 1
         
-    creds = None
-    
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Go up one level to the project root
-    project_root = os.path.dirname(script_dir)
+        for path, data in pending.items():
+            try:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w") as token:
+                    token.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Could not save {path}: {e}")
+        # Our own write must not make the cache think the file changed underneath it
+        _calendar_service_cache["mtime"] = _token_mtime()
+        
+        for _ in range(processed):
+            _token_writes.task_done()
+
+
+threading.Thread(target=_token_writer, name="token-writer", daemon=True).start()
+# Don't lose a freshly authorized token if the process exits right away
+atexit.register(_token_writes.join)
+
+
+def _save_credentials(creds):
+    """
+    Queues the credentials to be saved to token.json for the next run.
+    """
+    _token_writes.put((_TOKEN_PATH, creds.to_json()))
+
+
+# Refresh tokens this long before they expire, off the event-creation path
+_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+# Serializes refreshes so the background timer and event creation never both refresh
+_creds_lock = threading.Lock()
+_refresh_timer = None
+
+
+def _utcnow():
+    """
+    Returns the current time as a naive UTC datetime, the form google-auth uses for expiry.
+    """
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _needs_refresh(creds):
+    """
+    Returns True if the access token expires within the refresh margin.
+    """
+    return creds.expiry is None or creds.expiry - _utcnow() <= _REFRESH_MARGIN
+
+
+def _refresh_credentials(creds):
+    """
+    Refreshes and saves the credentials, then schedules the next background refresh.
+    """
+    with _creds_lock:
+        # Another thread may have refreshed them while we waited for the lock
+        if _needs_refresh(creds):
+            creds.refresh(Request())
+            _save_credentials(creds)
+    _schedule_refresh(creds)
+
+
+def _refresh_in_background(creds):
+    """
+    Timer callback; failures are left for the next event creation to retry inline.
+    """
+    try:
+        _refresh_credentials(creds)
+    except Exception as e:
+        logger.warning(f"Background refresh of Google credentials failed: {e}")
+
+
+def _schedule_refresh(creds):
+    """
+    Starts a daemon timer that refreshes the credentials shortly before they expire.
+    """
+    global _refresh_timer
+    if _refresh_timer is not None:
+        _refresh_timer.cancel()
+    if not creds.expiry or not creds.refresh_token:
+        return
     
-    # Paths for credentials and token files
-    credentials_path = os.path.join(project_root, "credentials.json")
-    token_path = os.path.join(project_root, "token.json")
+    delay = (creds.expiry - _utcnow() - _REFRESH_MARGIN).total_seconds()
+    _refresh_timer = threading.Timer(max(delay, 0), _refresh_in_background, args=(creds,))
+    _refresh_timer.daemon = True
+    _refresh_timer.start()
+
+
+def _load_credentials():
+    """
+    Loads the Google OAuth credentials, refreshing or authorizing them if needed.
     
+    Raises:
+        FileNotFoundError: If no valid token exists and credentials.json is missing
+    """
+    creds = None
     # The file token.json stores the user's access and refresh tokens, and is
     # created automatically when the authorization flow completes for the first
     # time.
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, CALENDAR_SCOPES)
+    if os.path.exists(_TOKEN_PATH):
+        with open(_TOKEN_PATH, "rb") as token:
+            creds = Credentials.from_authorized_user_info(orjson.loads(token.read()), CALENDAR_SCOPES)
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
-            if not os.path.exists(credentials_path):
-                logger.error(f"credentials.json not found at {credentials_path}. Please download your OAuth2 credentials from Google Cloud Console and save them as 'credentials.json' in the project root directory.")
-                return
+            if not os.path.exists(_CREDENTIALS_PATH):
+                raise FileNotFoundError(f"credentials.json not found at {_CREDENTIALS_PATH}")
                 
             flow = InstalledAppFlow.from_client_secrets_file(
-                credentials_path, CALENDAR_SCOPES
+                _CREDENTIALS_PATH, CALENDAR_SCOPES
             )
             creds = flow.run_local_server(port=0)
         # Save the credentials for the next run
-        with open(token_path, "w") as token:
-            token.write(creds.to_json())
+        _save_credentials(creds)
+    return creds
 
-    try:
-        service = build("calendar", "v3", credentials=creds)
 
-        # ALWAYS use today's date regardless of what was passed in
-        event_date = datetime.date.today()
-        start_hour, start_min = map(int, start_time.split(':'))
-        end_hour, end_min = map(int, end_time.split(':'))
-        
-        # Create datetime objects
-        start_datetime = datetime.datetime.combine(event_date, datetime.time(start_hour, start_min))
-        end_datetime = datetime.datetime.combine(event_date, datetime.time(end_hour, end_min))
-        
-        # Format for Google Calendar API (ISO format)
-        start_iso = start_datetime.isoformat()
-        end_iso = end_datetime.isoformat()
-        
-        # Prepare attendees list
-        attendee_list = [{'email': email} for email in attendees]
+def _get_service():
+    """
+    Returns the cached credentials and Google Calendar service.
+    
+    The credentials are only reloaded when token.json changed on disk since
+    they were loaded. The service is built once per process from the
+    discovery document bundled with google-api-python-client, so no schema is
+    fetched over the network, and uses a single keep-alive HTTP client so
+    inserts reuse the TLS connection.
+    
+    Raises:
+        FileNotFoundError: If no valid token exists and credentials.json is missing
+    """
+    cache = _calendar_service_cache
+    if cache["service"] is not None and cache["mtime"] == _token_mtime():
+        return cache["creds"], cache["service"]
+    
+    creds = _load_credentials()
+    if cache["service"] is None:
+        http = AuthorizedHttp(creds, http=httplib2.Http())
+        service = build(
+            "calendar", "v3",
+            http=http,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+        cache.update(http=http, service=service)
+    else:
+        # Only the credentials changed; keep the parsed service and its connection
+        cache["http"].credentials = creds
+    cache.update(creds=creds, mtime=_token_mtime())
+    _schedule_refresh(creds)
+    return creds, cache["service"]
+
+
+# Time zone the events are created in (you may want to make this configurable)
+_CALENDAR_TIMEZONE = 'America/Los_Angeles'
+# 24-hour H:MM or HH:MM
+_TIME_RE = re.compile(r'([01]?\d|2[0-3]):[0-5]\d')
+
+
+def _build_event_body(title, description, start_time, end_time, location="", attendees=None):
+    """
+    Builds the Google Calendar event resource for an event today.
+    
+    Args:
+        title: Event title
+        description: Event description
+        start_time: Start time in HH:MM format (a single-digit hour is allowed)
+        end_time: End time in HH:MM format (a single-digit hour is allowed)
+        location: Event location (optional)
+        attendees: List of email addresses (optional)
         
-        # Define the event details
-        event = {
-            'summary': title,
-            'location': location,
-            'description': description,
-            'start': {
-                'dateTime': start_iso,
-                'timeZone': 'America/Los_Angeles',  # You may want to make this configurable
-            },
-            'end': {
-                'dateTime': end_iso,
-                'timeZone': 'America/Los_Angeles',
-            },
-            'attendees': attendee_list,
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 24 * 60},
-                    {'method': 'popup', 'minutes': 10},
-                ],
-            },
-        }
+    Raises:
+        ValueError: If start_time or end_time is not a valid H:MM or HH:MM time
+    """
+    times = []
+    for value in (start_time, end_time):
+        if not _TIME_RE.fullmatch(value):
+            raise ValueError(f"Invalid time {value!r}, expected HH:MM")
+        # Pad single-digit hours such as "9:00" to "09:00"
+        times.append(value.zfill(5))
+    start_time, end_time = times
+    
+    # ALWAYS use today's date regardless of what was passed in
+    today = datetime.date.today().isoformat()
+    
+    # Format for Google Calendar API (ISO format); the inputs are validated
+    # HH:MM strings, so no datetime objects are needed
+    start_iso = f"{today}T{start_time}:00"
+    end_iso = f"{today}T{end_time}:00"
+    
+    # Define the event details
+    event = {
+        'summary': title,
+        'location': location,
+        'description': description,
+        'start': {
+            'dateTime': start_iso,
+            'timeZone': _CALENDAR_TIMEZONE,
+        },
+        'end': {
+            'dateTime': end_iso,
+            'timeZone': _CALENDAR_TIMEZONE,
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 24 * 60},
+                {'method': 'popup', 'minutes': 10},
+            ],
+        },
+    }
+    
+    # Most voice notes have no attendees, so the key is only added when needed
+    if attendees:
+        event['attendees'] = [{'email': email} for email in attendees]
+    
+    return event
+
+
+def _get_fresh_service():
+    """
+    Returns the cached Calendar service, refreshing the token first if it expired.
+    
+    Returns None (after logging why) if no credentials are available.
+    """
+    try:
+        creds, service = _get_service()
+    except FileNotFoundError as error:
+        logger.error(f"{error}. Please download your OAuth2 credentials from Google Cloud Console and save them as 'credentials.json' in the project root directory.")
+        return None
+    
+    # Normally the background timer has already refreshed the token; this only
+    # runs if that refresh failed or the process was suspended past expiry
+    if creds.expired and creds.refresh_token:
+        _refresh_credentials(creds)
+    return service
+
+
+def create_calendar_event_from_data(title, description, date_str, start_time, end_time, location="", attendees=None):
+    """
+    Creates a Google Calendar event with the provided data.
+    
+    Args:
+        title: Event title
+        description: Event description  
+        date_str: Date in YYYY-MM-DD format (IGNORED - always uses today's date)
+        start_time: Start time in HH:MM format
+        end_time: End time in HH:MM format
+        location: Event location (optional)
+        attendees: List of email addresses (optional)
+    """
+    # Build (and validate) the event first so malformed input never triggers
+    # a token refresh or any other network work
+    event = _build_event_body(title, description, start_time, end_time, location, attendees)
 
+    service = _get_fresh_service()
+    if service is None:
+        return
+
+    try:
         # Call the Calendar API to insert the event
         created_event = service.events().insert(calendarId='primary', body=event).execute()
         logger.info(f"Calendar event created successfully: {created_event.get('htmlLink')}")
@@ -123,67 +387,206 @@ def create_calendar_event_from_data(title, description, date_str, start_time, en
         raise
 
 
-def create_notion_note(title: str, content: str):
+# Google accepts up to 1000 calls per batch; smaller batches keep a failed batch cheap to retry
+_CALENDAR_BATCH_SIZE = 50
+
+
+def create_calendar_events_bulk(events_data):
     """
-    Creates a new note as a sub-page within the specified PARENT_PAGE_ID.
+    Creates several Google Calendar events using one batch request per 50 events.
     
     Args:
-        title (str): The title of the new note.
-        content (str): The main text content of the note.
+        events_data: List of dictionaries with the arguments of
+            create_calendar_event_from_data (date_str may be omitted)
+            
+    Returns:
+        The created events in input order, with None for events that were
+        invalid or failed (all None if no credentials are available)
     """
-    
-    # The Notion API endpoint for creating pages
-    url = "https://api.notion.com/v1/pages"
+    created_events = [None] * len(events_data)
+
+    # Build (and validate) every event before any network work; an invalid
+    # event is skipped so it doesn't cost the others their calendar entries
+    events = {}
+    for index, data in enumerate(events_data):
+        try:
+            events[index] = _build_event_body(
+                data['title'],
+                data['description'],
+                data['start_time'],
+                data['end_time'],
+                data.get('location', ''),
+                data.get('attendees'),
+            )
+        except ValueError as e:
+            logger.error(f"Skipping calendar event {data['title']!r}: {e}")
+    if not events:
+        return created_events
+
+    service = _get_fresh_service()
+    if service is None:
+        return created_events
 
-    # Headers required by the Notion API
-    headers = {
-        "Authorization": f"Bearer {NOTION_API_KEY}",
-        "Content-Type": "application/json",
-        "Notion-Version": "2022-06-28",  # Required version header
+    try:
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Google Calendar API error: {exception}")
+                return
+            created_events[int(request_id)] = response
+            logger.info(f"Calendar event created successfully: {response.get('htmlLink')}")
+
+        pending = list(events.items())
+        for offset in range(0, len(pending), _CALENDAR_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_response)
+            for index, event in pending[offset:offset + _CALENDAR_BATCH_SIZE]:
+                batch.add(
+                    service.events().insert(calendarId='primary', body=event),
+                    request_id=str(index)
+                )
+            batch.execute()
+
+        failed = [index for index, created in enumerate(created_events) if created is None]
+        if failed:
+            logger.error(f"{len(failed)} of {len(events_data)} calendar events failed (indices {failed})")
+        return created_events
+
+    except HttpError as error:
+        logger.error(f"Google Calendar API error: {error}")
+        raise
+
+
+# The Notion API endpoint for creating pages
+_NOTION_PAGES_URL = "https://api.notion.com/v1/pages"
+
+# Invariant payload fragments, shared by every request; orjson serializes them
+# in place, so they are never copied or mutated
+_NOTION_PARENT = {"page_id": PARENT_PAGE_ID}
+# Notion rejects empty text objects, so blank lines get no rich text
+_EMPTY_PARAGRAPH = {"object": "block", "type": "paragraph", "paragraph": {"rich_text": []}}
+
+
+def _paragraph_block(text: str):
+    """
+    Builds a Notion paragraph block holding a single line of text.
+    """
+    if not text:
+        return _EMPTY_PARAGRAPH
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {"rich_text": [{"type": "text", "text": {"content": text}}]}
     }
 
+
+def create_notion_note(title: str, content: Union[str, List[str]]):
+    """
+    Creates a new note as a sub-page within the specified PARENT_PAGE_ID.
+    
+    Args:
+        title (str): The title of the new note.
+        content (str | list[str]): The main text content of the note. A list
+            is rendered as one paragraph block per line.
+    
+    Returns:
+        The URL of the created page, or None if the note could not be created
+        or the response did not include its URL
+    """
+    if isinstance(content, str):
+        content = [content]
+
     # The data payload for the new page
-    # This specifies the parent, the title, and the content blocks
+    # Only the title and content blocks are built per call
     payload = {
-        "parent": {"page_id": PARENT_PAGE_ID},
-        "properties": {
-            "title": [
-                {
-                    "text": {
-                        "content": title
-                    }
-                }
-            ]
-        },
-        "children": [
-            {
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": content
-                            }
-                        }
-                    ]
-                }
-            }
-        ]
+        "parent": _NOTION_PARENT,
+        "properties": {"title": [{"text": {"content": title}}]},
+        "children": [_paragraph_block(line) for line in content]
     }
 
     # Make the API request
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = _notion_session.post(_NOTION_PAGES_URL, data=orjson.dumps(payload), timeout=_NOTION_TIMEOUT)
         
         # Check if the request was successful
-        if response.status_code == 200:
-            new_page_url = response.json().get("url")
-            logger.info(f"Notion note created successfully: {new_page_url}")
+        if 200 <= response.status_code < 300:
+            try:
+                # orjson decodes the page object straight from the raw bytes
+                page = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
+                page = None
+            new_page_url = page.get("url") if isinstance(page, dict) else None
+            if new_page_url is None:
+                # The page exists; only its URL is unknown (e.g. a 204 or non-JSON body)
+                logger.info("Notion note created successfully (Status Code: %d)", response.status_code)
+                return None
+            logger.info("Notion note created successfully: %s", new_page_url)
+            return new_page_url
         else:
             # Log error details if something went wrong
-            logger.error(f"Error creating Notion note (Status Code: {response.status_code}): {response.text}")
+            logger.error(
+                "Error creating Notion note (Status Code: %d): %s",
+                response.status_code, response.text
+            )
             
     except requests.exceptions.RequestException as e:
-        logger.error(f"Network request error while creating Notion note: {e}")
\ No newline at end of file
+        logger.error("Network request error while creating Notion note: %s", e)
+
+
+# Worker threads for the Notion and Calendar requests of create_note_and_event
+_io_pool = ThreadPoolExecutor(max_workers=4)
+atexit.register(_io_pool.shutdown, wait=False)
+
+
+def create_note_and_event(title, note_content, description, date_str, start_time, end_time, location="", attendees=None):
+    """
+    Creates the Notion note and the Google Calendar event for one event concurrently.
+    
+    The two requests share no data, so their round trips overlap instead of
+    running back to back. Both are waited for before any error is raised.
+    
+    Args:
+        title: Note and event title
+        note_content: Content of the Notion note (string or list of lines)
+        description: Event description
+        date_str: Date in YYYY-MM-DD format (IGNORED - always uses today's date)
+        start_time: Start time in HH:MM format
+        end_time: End time in HH:MM format
+        location: Event location (optional)
+        attendees: List of email addresses (optional)
+    
+    Returns:
+        Tuple of (Notion page URL or None, created Calendar event or None)
+    """
+    notion_future = _io_pool.submit(create_notion_note, title, note_content)
+    calendar_future = _io_pool.submit(
+        create_calendar_event_from_data,
+        title, description, date_str, start_time, end_time, location, attendees
+    )
+    # Wait for the note either way; if both fail, the Calendar error is the one raised
+    notion_error = notion_future.exception()
+    calendar_result = calendar_future.result()
+    if notion_error is not None:
+        raise notion_error
+    return notion_future.result(), calendar_result
+
+
+async def acreate_notion_note(title: str, content: Union[str, List[str]]):
+    """
+    Async version of create_notion_note for callers running an event loop.
+    
+    The request runs on a worker thread so it keeps using the pooled Notion
+    session and its retry policy.
+    """
+    return await asyncio.to_thread(create_notion_note, title, content)
+
+
+async def acreate_calendar_event_from_data(title, description, date_str, start_time, end_time, location="", attendees=None):
+    """
+    Async version of create_calendar_event_from_data for callers running an event loop.
+    
+    The request runs on a worker thread so it keeps using the cached Calendar
+    service and credentials.
+    """
+    return await asyncio.to_thread(
+        create_calendar_event_from_data,
+        title, description, date_str, start_time, end_time, location, attendees
+    )